@@ -3,6 +3,8 @@ Med Scheduler Engine
 Core components for AI-powered medication scheduling
 """
 
+from importlib import import_module
+
 from .models import (
     Medication,
     Constraint,
@@ -10,12 +12,26 @@ from .models import (
     MissedDose,
     RescheduleProposal
 )
-from .optimizer import AIOptimizer
-from .rule_loader import RuleLoader
-from .api_client import OpenFDAClient
 
 __version__ = "0.1.0"
 
+# Components with heavier dependencies (Gemini SDK, PyYAML, HTTP clients)
+# are imported on first attribute access rather than with the package
+_LAZY_IMPORTS = {
+    'AIOptimizer': '.optimizer',
+    'RuleLoader': '.rule_loader',
+    'OpenFDAClient': '.api_client',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'Medication',
     'Constraint',
@@ -1,9 +1,127 @@
 """
 API client for fetching drug data from OpenFDA
 """
-import requests
+import asyncio
+import copy
+import logging
+import time
+from functools import wraps
 from typing import Dict, List, Optional
-import json
+
+from cachetools import Cache, LFUCache
+
+# orjson parses large label documents several times faster than stdlib json
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# The HTTP libraries (requests, aiohttp and their optional on-disk caches)
+# are imported on first use, so importing this module stays cheap for
+# callers that only need the mock data.
+
+log = logging.getLogger(__name__)
+
+
+
+class _ExpiringLFUCache(LFUCache):
+    """
+    LFU cache whose entries also expire ttl seconds after being stored
+    
+    Drug lookups are heavy-tailed (a few common meds dominate), so evicting
+    the least *frequently* used entry keeps the hot drugs resident; the TTL
+    still lets their label data refresh. Tracks hits and misses for tuning.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, timer=time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+    
+    def __getitem__(self, key):
+        try:
+            expires, value = super().__getitem__(key)
+            if expires < self.timer():
+                del self[key]
+                raise KeyError(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return value
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, (self.timer() + self.ttl, value))
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def pop(self, key, *default):
+        # LFUCache.popitem evicts through pop, so read the stored entry
+        # directly: an expired victim must still be removable, and
+        # evictions shouldn't count as hits or misses
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        _, value = Cache.__getitem__(self, key)
+        del self[key]
+        return value
+
+
+# In-process caches keyed on the normalized drug name
+_SEARCH_CACHE = _ExpiringLFUCache(maxsize=256, ttl=3600)
+_PROFILE_CACHE = _ExpiringLFUCache(maxsize=256, ttl=3600)
+
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counts and sizes of the in-process drug caches, for tuning maxsize"""
+    return {
+        name: {
+            'hits': cache.hits,
+            'misses': cache.misses,
+            'size': len(cache),
+            'maxsize': cache.maxsize,
+        }
+        for name, cache in (('search', _SEARCH_CACHE), ('profile', _PROFILE_CACHE))
+    }
+
+
+def _normalize_drug_name(drug_name: str) -> str:
+    """Normalize a drug name for use as a cache key"""
+    return drug_name.strip().lower()
+
+
+def _cached_by_drug_name(cache: Cache):
+    """
+    Memoize a client method on its (normalized) drug name argument
+    
+    Misses (None) are not stored, so a lookup that failed because the API
+    was unreachable is retried on the next call instead of sticking.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, drug_name: str):
+            key = _normalize_drug_name(drug_name)
+            try:
+                result = cache[key]
+            except KeyError:
+                log.debug("%s cache miss for %s", method.__name__, key)
+            else:
+                log.debug("%s cache hit for %s", method.__name__, key)
+                return result
+            
+            result = method(self, drug_name)
+            if result is not None:
+                cache[key] = result
+            return result
+        return wrapper
+    return decorator
 
 
 class OpenFDAClient:
@@ -11,8 +129,94 @@ class OpenFDAClient:
     
     BASE_URL = "https://api.fda.gov/drug"
     
-    def __init__(self):
-        self.session = requests.Session()
+    # Connection pool sizing and retry policy for the sync session
+    POOL_CONNECTIONS = 20
+    POOL_MAXSIZE = 50
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    # Bulk lookups: drugs per OR-query (keeps URLs well under length caps)
+    # and label records requested per drug. The resulting limit covers the
+    # whole OR-query, so a drug with many labels can still take most of the
+    # results; names left unmatched fall back to search_drug.
+    BULK_CHUNK_SIZE = 20
+    BULK_RESULTS_PER_DRUG = 5
+    MAX_LIMIT = 100
+    
+    # On-disk response cache lifetimes, in seconds. OpenFDA answers
+    # "no match" with a 404; those expire sooner so typos get retried.
+    CACHE_EXPIRE_AFTER = 86400
+    NOT_FOUND_EXPIRE_AFTER = 3600
+    
+    def __init__(self, cache_name: Optional[str] = "openfda_cache"):
+        """
+        Initialize the OpenFDA client
+        
+        Args:
+            cache_name: Base name of the SQLite response cache (used when
+                requests-cache / aiohttp-client-cache are installed), or
+                None to disable on-disk caching
+        """
+        self.cache_name = cache_name
+        self._session = None
+        self._async_session = None
+        self._async_session_loop = None
+    
+    @property
+    def session(self):
+        """The pooled requests session, created on first use"""
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+    
+    @session.setter
+    def session(self, session):
+        self._session = session
+    
+    def _create_session(self):
+        """Build the sync session, with the on-disk cache if requests-cache is installed"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = None
+        if self.cache_name:
+            try:
+                import requests_cache
+            except ImportError:
+                pass
+            else:
+                session = requests_cache.CachedSession(
+                    self.cache_name,
+                    backend='sqlite',
+                    expire_after=self.CACHE_EXPIRE_AFTER,
+                    allowable_codes=(200, 404)
+                )
+        if session is None:
+            session = requests.Session()
+        
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=self.RETRY_STATUSES
+            )
+        )
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self):
+        """Close the pooled HTTP session, if one was opened"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def search_drug(self, drug_name: str) -> Optional[Dict]:
         """
@@ -24,53 +228,292 @@ class OpenFDAClient:
         Returns:
             Drug information dict or None if not found
         """
+        # Copied so callers can't change the cached record
+        return copy.deepcopy(self._search_drug(drug_name))
+    
+    @_cached_by_drug_name(_SEARCH_CACHE)
+    def _search_drug(self, drug_name: str) -> Optional[Dict]:
+        """The cached label record behind search_drug; never hand it out directly"""
+        import requests
+        
         try:
             # Search in drug labels
             url = f"{self.BASE_URL}/label.json"
-            params = {
-                'search': f'openfda.brand_name:"{drug_name}" OR openfda.generic_name:"{drug_name}"',
-                'limit': 1
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=self._label_params(drug_name), timeout=10)
+            if response.status_code == 404:
+                self._expire_not_found_sooner(response)
+                return None
             response.raise_for_status()
             
-            data = response.json()
+            data = _json_loads(response.content)
             
-            if 'results' in data and len(data['results']) > 0:
-                return data['results'][0]
+            return self._first_result(data)
             
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log.warning("Error fetching drug data for %s: %s", drug_name, e)
             return None
+    
+    def search_drugs_bulk(self, drug_names: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Search for several drugs using as few requests as possible
+        
+        Names are resolved with one OR-query per chunk of BULK_CHUNK_SIZE
+        drugs. Results are matched back to the input names via their
+        openfda brand/generic names; anything left unmatched falls back to
+        a regular search_drug call.
+        
+        Args:
+            drug_names: Names of the drugs to search for
+            
+        Returns:
+            Dict mapping each input name to its drug information (or None)
+        """
+        results = {}
+        pending = {}  # normalized name -> input names sharing it
+        
+        for name in drug_names:
+            key = _normalize_drug_name(name)
+            cached_result = _SEARCH_CACHE.get(key)
+            if cached_result is not None:
+                results[name] = cached_result
+            else:
+                pending.setdefault(key, []).append(name)
+        
+        keys = list(pending)
+        for start in range(0, len(keys), self.BULK_CHUNK_SIZE):
+            chunk = keys[start:start + self.BULK_CHUNK_SIZE]
+            matched = self._search_label_batch(chunk)
+            
+            for key in chunk:
+                drug_data = matched.get(key)
+                if drug_data is not None:
+                    _SEARCH_CACHE[key] = drug_data
+                else:
+                    drug_data = self._search_drug(pending[key][0])
+                
+                for name in pending[key]:
+                    results[name] = drug_data
+        
+        # Copied so callers can't change the cached records
+        return {name: copy.deepcopy(results[name]) for name in drug_names}
+    
+    def _search_label_batch(self, keys: List[str]) -> Dict[str, Dict]:
+        """
+        Run a single OR-query for several normalized drug names
+        
+        Returns:
+            Dict mapping each matched key to its first matching label record
+        """
+        query = " OR ".join(
+            f'openfda.brand_name:"{key}" OR openfda.generic_name:"{key}"'
+            for key in keys
+        )
+        params = {
+            'search': query,
+            'limit': min(len(keys) * self.BULK_RESULTS_PER_DRUG, self.MAX_LIMIT)
+        }
+        
+        import requests
+        
+        try:
+            url = f"{self.BASE_URL}/label.json"
+            response = self.session.get(url, params=params, timeout=10)
+            if response.status_code == 404:
+                self._expire_not_found_sooner(response)
+                return {}
+            response.raise_for_status()
+            data = _json_loads(response.content)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log.warning("Error fetching bulk drug data: %s", e)
+            return {}
+        
+        matched = {}
+        for record in data.get('results', []):
+            openfda = record.get('openfda', {})
+            # Pad with spaces so "metformin" matches "metformin hydrochloride"
+            # but not "dexmetformin"
+            label_names = [
+                f" {label_name.lower()} "
+                for label_name in openfda.get('brand_name', []) + openfda.get('generic_name', [])
+            ]
+            for key in keys:
+                if key not in matched and any(f" {key} " in n for n in label_names):
+                    matched[key] = record
+        
+        return matched
+    
+    async def search_drug_async(self, drug_name: str) -> Optional[Dict]:
+        """
+        Async variant of search_drug, sharing the same result cache
+        
+        Args:
+            drug_name: Name of the drug to search for
             
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching drug data for {drug_name}: {e}")
+        Returns:
+            Drug information dict or None if not found
+        """
+        # Copied so callers can't change the cached record
+        return copy.deepcopy(await self._search_drug_async(drug_name))
+    
+    async def _search_drug_async(self, drug_name: str) -> Optional[Dict]:
+        """The cached label record behind search_drug_async; never hand it out directly"""
+        key = _normalize_drug_name(drug_name)
+        cached_result = _SEARCH_CACHE.get(key)
+        if cached_result is not None:
+            log.debug("search_drug_async cache hit for %s", key)
+            return cached_result
+        log.debug("search_drug_async cache miss for %s", key)
+        
+        session = await self._get_async_session()
+        import aiohttp
+        
+        try:
+            url = f"{self.BASE_URL}/label.json"
+            async with session.get(url, params=self._label_params(drug_name)) as response:
+                if response.status == 404:
+                    await self._expire_not_found_sooner_async(session, response)
+                    return None
+                response.raise_for_status()
+                data = _json_loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            log.warning("Error fetching drug data for %s: %s", drug_name, e)
             return None
+        
+        result = self._first_result(data)
+        if result is not None:
+            _SEARCH_CACHE[key] = result
+        return result
     
-    def get_drug_interactions(self, drug_name: str) -> List[str]:
+    async def bulk_search(self, drug_names: List[str]) -> List[Optional[Dict]]:
         """
-        Get drug interaction information
+        Look up several drugs concurrently
         
         Args:
-            drug_name: Name of the drug
+            drug_names: Names of the drugs to search for
             
         Returns:
-            List of interaction warnings
+            Drug information dicts (or None) in the same order as drug_names
         """
-        drug_data = self.search_drug(drug_name)
+        # Query each distinct drug once, even if it is listed several times
+        unique_names = {}
+        for name in drug_names:
+            unique_names.setdefault(_normalize_drug_name(name), name)
+
+        results = await asyncio.gather(
+            *(self._search_drug_async(name) for name in unique_names.values())
+        )
+        by_key = dict(zip(unique_names, results))
+        # Copied per entry, so repeated names don't share one dict either
+        return [copy.deepcopy(by_key[_normalize_drug_name(name)]) for name in drug_names]
+    
+    async def aclose(self):
+        """Close the async HTTP session, if one was opened"""
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+            self._async_session_loop = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def _get_async_session(self):
+        """
+        Lazily create the aiohttp session for the running event loop
         
-        if not drug_data:
-            return []
+        A session only works on the loop it was created on, so a new one is
+        made when the client is reused under a later asyncio.run().
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_session is not None and not self._async_session.closed:
+            if self._async_session_loop is loop:
+                return self._async_session
+            log.debug("Async session belongs to another event loop; creating a new one")
+            if self._async_session_loop.is_closed():
+                # Nothing is left to shut down, so this just marks it closed
+                await self._async_session.close()
         
-        interactions = []
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("aiohttp not installed. Install with: pip install aiohttp")
         
-        # Check various interaction fields
-        if 'drug_interactions' in drug_data:
-            interactions.extend(drug_data['drug_interactions'])
+        timeout = aiohttp.ClientTimeout(total=10)
+        self._async_session = None
+        if self.cache_name:
+            try:
+                from aiohttp_client_cache import CachedSession, SQLiteBackend
+                
+                # Separate file: the two libraries use incompatible schemas.
+                # Raises ImportError here if aiosqlite isn't installed.
+                backend = SQLiteBackend(
+                    f"{self.cache_name}_async",
+                    expire_after=self.CACHE_EXPIRE_AFTER,
+                    allowed_codes=(200, 404)
+                )
+            except ImportError:
+                pass
+            else:
+                self._async_session = CachedSession(cache=backend, timeout=timeout)
+        if self._async_session is None:
+            self._async_session = aiohttp.ClientSession(timeout=timeout)
+        self._async_session_loop = loop
+        return self._async_session
+    
+    def _expire_not_found_sooner(self, response):
+        """Re-save a freshly cached 404 with the shorter NOT_FOUND_EXPIRE_AFTER lifetime"""
+        if getattr(response, 'from_cache', True):
+            return  # either already cached or not a requests-cache session
         
-        if 'warnings' in drug_data:
-            interactions.extend(drug_data['warnings'])
+        import requests_cache
         
-        return interactions
+        self.session.cache.save_response(
+            response,
+            expires=requests_cache.get_expiration_datetime(self.NOT_FOUND_EXPIRE_AFTER)
+        )
+    
+    async def _expire_not_found_sooner_async(self, session, response):
+        """Async counterpart of _expire_not_found_sooner, for the aiohttp-client-cache session"""
+        if getattr(response, 'from_cache', True):
+            return  # either already cached or not an aiohttp-client-cache session
+        
+        from aiohttp_client_cache.cache_control import get_expiration_datetime
+        
+        await session.cache.save_response(
+            response,
+            expires=get_expiration_datetime(self.NOT_FOUND_EXPIRE_AFTER)
+        )
+    
+    @staticmethod
+    def _label_params(drug_name: str) -> Dict:
+        """Build the label.json query parameters for a single drug"""
+        return {
+            'search': f'openfda.brand_name:"{drug_name}" OR openfda.generic_name:"{drug_name}"',
+            'limit': 1
+        }
+    
+    @staticmethod
+    def _first_result(data: Dict) -> Optional[Dict]:
+        """Return the first record of an OpenFDA response, if any"""
+        if 'results' in data and len(data['results']) > 0:
+            return data['results'][0]
+        
+        return None
+    
+    def get_drug_interactions(self, drug_name: str) -> List[str]:
+        """
+        Get drug interaction information
+        
+        Args:
+            drug_name: Name of the drug
+            
+        Returns:
+            List of interaction warnings
+        """
+        profile = self._drug_profile(drug_name)
+        return list(profile['interactions']) if profile else []
     
     def get_dosage_info(self, drug_name: str) -> Optional[str]:
         """
@@ -82,16 +525,8 @@ class OpenFDAClient:
         Returns:
             Dosage information string or None
         """
-        drug_data = self.search_drug(drug_name)
-        
-        if not drug_data:
-            return None
-        
-        # Try to extract dosage info
-        if 'dosage_and_administration' in drug_data:
-            return drug_data['dosage_and_administration'][0] if drug_data['dosage_and_administration'] else None
-        
-        return None
+        profile = self._drug_profile(drug_name)
+        return profile['dosage'] if profile else None
     
     def get_food_interactions(self, drug_name: str) -> Optional[Dict]:
         """
@@ -103,11 +538,79 @@ class OpenFDAClient:
         Returns:
             Dict with food interaction info or None
         """
-        drug_data = self.search_drug(drug_name)
+        profile = self._drug_profile(drug_name)
+        return self._copy_food_info(profile['food_info']) if profile else None
+    
+    def get_drug_profile(self, drug_name: str) -> Optional[Dict]:
+        """
+        Get interactions, dosage and food info from a single label lookup
+        
+        Prefer this over calling get_drug_interactions, get_dosage_info and
+        get_food_interactions separately, which are thin wrappers around it.
+        
+        Args:
+            drug_name: Name of the drug
+            
+        Returns:
+            Dict with 'interactions', 'dosage' and 'food_info' keys, or None
+        """
+        profile = self._drug_profile(drug_name)
+        if not profile:
+            return None
+        
+        # Copies, so callers can't change what later lookups return
+        return {
+            'interactions': list(profile['interactions']),
+            'dosage': profile['dosage'],
+            'food_info': self._copy_food_info(profile['food_info']),
+        }
+    
+    # Original name for get_drug_profile
+    get_all_info = get_drug_profile
+    
+    @_cached_by_drug_name(_PROFILE_CACHE)
+    def _drug_profile(self, drug_name: str) -> Optional[Dict]:
+        """The cached profile shared by the getters above; never hand it out directly"""
+        drug_data = self._search_drug(drug_name)
         
         if not drug_data:
             return None
         
+        return {
+            'interactions': self._extract_interactions(drug_data),
+            'dosage': self._extract_dosage(drug_data),
+            'food_info': self._extract_food(drug_data),
+        }
+    
+    @staticmethod
+    def _copy_food_info(food_info: Dict) -> Dict:
+        return {**food_info, 'notes': list(food_info['notes'])}
+    
+    @staticmethod
+    def _extract_interactions(drug_data: Dict) -> List[str]:
+        """Collect interaction warnings from a label record"""
+        interactions = []
+        
+        # Check various interaction fields
+        if 'drug_interactions' in drug_data:
+            interactions.extend(drug_data['drug_interactions'])
+        
+        if 'warnings' in drug_data:
+            interactions.extend(drug_data['warnings'])
+        
+        return interactions
+    
+    @staticmethod
+    def _extract_dosage(drug_data: Dict) -> Optional[str]:
+        """Pull the dosage and administration text out of a label record"""
+        if drug_data.get('dosage_and_administration'):
+            return drug_data['dosage_and_administration'][0]
+        
+        return None
+    
+    @classmethod
+    def _extract_food(cls, drug_data: Dict) -> Dict:
+        """Derive with/without food guidance from a label record"""
         food_info = {
             'with_food': False,
             'empty_stomach': False,
@@ -115,7 +618,7 @@ class OpenFDAClient:
         }
         
         # Search in dosage instructions
-        dosage = self.get_dosage_info(drug_name)
+        dosage = cls._extract_dosage(drug_data)
         if dosage:
             dosage_lower = dosage.lower()
             if 'with food' in dosage_lower or 'with meal' in dosage_lower:
@@ -127,7 +630,6 @@ class OpenFDAClient:
         
         return food_info
 
-
 # Simple mock data for demo purposes (when API is down or for testing)
 MOCK_DRUG_DATA = {
     'lisinopril': {
@@ -160,6 +662,19 @@ MOCK_DRUG_DATA = {
 }
 
 
+def _build_mock_index(mock_data: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Map each mock drug's generic and brand names to its entry"""
+    index = {}
+    for key, entry in mock_data.items():
+        names = [key, entry['generic_name']] + entry['brand_name'].split(',')
+        for name in names:
+            index.setdefault(_normalize_drug_name(name), entry)
+    return index
+
+
+_MOCK_INDEX = _build_mock_index(MOCK_DRUG_DATA)
+
+
 def get_mock_drug_data(drug_name: str) -> Optional[Dict]:
-    """Get mock drug data for demo purposes"""
-    return MOCK_DRUG_DATA.get(drug_name.lower())
\ No newline at end of file
+    """Get mock drug data for demo purposes (by generic or brand name)"""
+    return _MOCK_INDEX.get(_normalize_drug_name(drug_name))
\ No newline at end of file
@@ -1,12 +1,24 @@
 """
 Data models for the medication scheduler
 """
+import sys
 from dataclasses import dataclass, field
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from datetime import time, timedelta
 
 
-@dataclass
+@lru_cache(maxsize=1024)
+def _name_key(name: str) -> str:
+    """
+    Normalized, interned key used by the Schedule lookup indexes
+    
+    Memoized so repeated lookups of the same name don't re-lowercase it.
+    """
+    return sys.intern(name.lower())
+
+
+@dataclass(slots=True, frozen=True)
 class Medication:
     """Represents a single medication with scheduling requirements"""
     name: str
@@ -28,7 +40,7 @@ class Medication:
         return f"Medication({self.name}, {self.dosage}, {self.frequency})"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Constraint:
     """Represents a scheduling constraint between medications"""
     type: str  # "time_gap", "food_requirement", "drug_interaction"
@@ -43,27 +55,83 @@ class Constraint:
         return f"Constraint({self.drug_a}: {self.description})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Schedule:
     """A complete medication schedule with all constraints"""
     medications: List[Medication]
     constraints: List[Constraint]
     
+    # Lowercased-name indexes (see _name_key), built once in __post_init__
+    _by_name: Dict[str, Medication] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _constraints_by_drug: Dict[str, List[Constraint]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    # Prompt text for each medication's times, built lazily by formatted_times
+    _med_lines: Optional[List[Tuple[str, str]]] = field(default=None, init=False, repr=False, compare=False)
+    _formatted_times_cache: Dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        for med in self.medications:
+            self._index_medication(med)
+        for constraint in self.constraints:
+            self._index_constraint(constraint)
+    
+    def add_medication(self, medication: Medication):
+        """Add a medication and keep the lookup index in sync"""
+        self.medications.append(medication)
+        self._index_medication(medication)
+        self._med_lines = None
+        self._formatted_times_cache.clear()
+    
+    def add_constraint(self, constraint: Constraint):
+        """Add a constraint and keep the lookup index in sync"""
+        self.constraints.append(constraint)
+        self._index_constraint(constraint)
+    
     def get_medication(self, name: str) -> Optional[Medication]:
         """Find a medication by name"""
-        for med in self.medications:
-            if med.name.lower() == name.lower():
-                return med
-        return None
+        return self._by_name.get(_name_key(name))
     
     def get_constraints_for_drug(self, drug_name: str) -> List[Constraint]:
         """Get all constraints involving a specific drug"""
-        return [c for c in self.constraints 
-                if c.drug_a.lower() == drug_name.lower() or 
-                (c.drug_b and c.drug_b.lower() == drug_name.lower())]
+        return list(self._constraints_by_drug.get(_name_key(drug_name), []))
+    
+    def formatted_times(self, exclude: str = "") -> str:
+        """
+        List every medication's scheduled times, one "- Name: scheduled at ..." line each
+        
+        Args:
+            exclude: Name of a medication to leave out (e.g. the missed one)
+            
+        Returns:
+            Newline-joined lines, or "" if no other medications remain
+        """
+        cached = self._formatted_times_cache.get(exclude)
+        if cached is not None:
+            return cached
+        
+        if self._med_lines is None:
+            self._med_lines = [
+                (m.name, f"- {m.name}: scheduled at {', '.join(t.strftime('%H:%M') for t in m.scheduled_times)}")
+                for m in self.medications
+            ]
+        
+        text = "\n".join(line for name, line in self._med_lines if name != exclude)
+        self._formatted_times_cache[exclude] = text
+        return text
+    
+    def _index_medication(self, med: Medication):
+        # First medication with a given name wins, as with a linear scan
+        self._by_name.setdefault(_name_key(med.name), med)
+    
+    def _index_constraint(self, constraint: Constraint):
+        drugs = {_name_key(constraint.drug_a)}
+        if constraint.drug_b:
+            drugs.add(_name_key(constraint.drug_b))
+        for drug in drugs:
+            self._constraints_by_drug.setdefault(drug, []).append(constraint)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MissedDose:
     """Represents a missed dose event that needs rescheduling"""
     medication_name: str
@@ -75,7 +143,7 @@ class MissedDose:
         return f"MissedDose({self.medication_name} at {self.scheduled_time}, now {self.current_time})"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RescheduleProposal:
     """AI-generated proposal for rescheduling after a missed dose"""
     missed_dose: MissedDose
@@ -2,39 +2,139 @@
 AI-powered optimizer for rescheduling medications
 Uses Google Gemini API to reason through constraints
 """
+import asyncio
+import logging
 import os
-from typing import Optional
-from datetime import time, datetime, timedelta
+import re
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Optional
+from datetime import time, timedelta
 from .models import Schedule, MissedDose, RescheduleProposal
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    print("Warning: google-generativeai not installed. Install with: pip install google-generativeai")
+log = logging.getLogger(__name__)
+
+# The RECOMMENDED_TIME / REASONING / WARNINGS lines requested in _build_prompt.
+# [ \t] rather than \s, so an empty field can't swallow the next line; a
+# trailing \r is allowed (and kept out of the groups) for CRLF responses
+_RESPONSE_RE = re.compile(
+    r'^[ \t]*RECOMMENDED_TIME:[ \t]*(?P<time>\d{1,2}:\d{2})[ \t\r]*$'
+    r'|^[ \t]*REASONING:[ \t]*(?P<reason>[^\r\n]+?)[ \t\r]*$'
+    r'|^[ \t]*WARNINGS:[ \t]*(?P<warn>[^\r\n]+?)[ \t\r]*$',
+    re.MULTILINE
+)
+
+
+# Lateness (in seconds) at which each rule-based window starts after the
+# first: within 2 hours, within 4 hours, then anything later
+_WINDOW_BOUNDS = (7200, 14400)
+
+# Rule-based outcome for each lateness window: (take now?, reasoning, warnings)
+_WINDOW_OUTCOMES = (
+    (True, "Take the dose now. You're within the acceptable window.", ()),
+    (
+        True,
+        "Take the dose now, but monitor for side effects.",
+        ("Dose is significantly delayed - contact provider if concerned",)
+    ),
+    (
+        False,
+        "Skip this dose and take the next scheduled dose.",
+        ("More than 4 hours late - safer to skip and resume normal schedule",)
+    ),
+)
+
+
+def _seconds_since_midnight(t: time) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+@lru_cache(maxsize=1024)
+def _rule_based_window(scheduled_time: time, current_time: time) -> int:
+    """
+    Index into _WINDOW_OUTCOMES for a dose taken this late
+    
+    Depends only on the two times, so it is memoized.
+    """
+    late = AIOptimizer._time_difference(scheduled_time, current_time).total_seconds()
+    return bisect_right(_WINDOW_BOUNDS, late)
+
+
+def _rule_based_windows(missed_doses: List[MissedDose]) -> List[int]:
+    """_rule_based_window for a whole batch, vectorized when NumPy is installed"""
+    try:
+        import numpy as np
+    except ImportError:
+        return [_rule_based_window(m.scheduled_time, m.current_time) for m in missed_doses]
+    
+    count = len(missed_doses)
+    scheduled = np.fromiter(
+        (_seconds_since_midnight(m.scheduled_time) for m in missed_doses), dtype=np.int32, count=count
+    )
+    current = np.fromiter(
+        (_seconds_since_midnight(m.current_time) for m in missed_doses), dtype=np.int32, count=count
+    )
+    late = (current - scheduled) % 86400
+    return np.searchsorted(_WINDOW_BOUNDS, late, side='right').tolist()
+
+
+def _window_proposal(missed_dose: MissedDose, window: int) -> RescheduleProposal:
+    take_now, reasoning, warnings = _WINDOW_OUTCOMES[window]
+    return RescheduleProposal(
+        missed_dose=missed_dose,
+        # Skipped doses keep their original time
+        new_time=missed_dose.current_time if take_now else missed_dose.scheduled_time,
+        reasoning=reasoning,
+        warnings=list(warnings)
+    )
 
 
 class AIOptimizer:
     """Uses AI to optimize medication schedules when doses are missed"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    _offline_instance: Optional["AIOptimizer"] = None
+    _offline_lock = threading.Lock()
+    
+    def __init__(self, api_key: Optional[str] = None, *, use_env: bool = True):
         """
         Initialize the AI optimizer
         
         Args:
             api_key: Gemini API key (or set GEMINI_API_KEY env variable)
+            use_env: Fall back to GEMINI_API_KEY when api_key isn't given
         """
-        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        self.api_key = api_key or (os.getenv('GEMINI_API_KEY') if use_env else None)
         self.model = None
         
-        if GEMINI_AVAILABLE and self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        elif not GEMINI_AVAILABLE:
-            print("Gemini API not available - using rule-based fallback")
-        elif not self.api_key:
-            print("No API key provided - using rule-based fallback")
+        if not self.api_key:
+            log.info("No API key provided - using rule-based fallback")
+            return
+        
+        # Only pay for importing the Gemini SDK when it will actually be used
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            log.info("google-generativeai not installed. Install with: pip install google-generativeai")
+            log.info("Gemini API not available - using rule-based fallback")
+            return
+        
+        genai.configure(api_key=self.api_key)
+        self.model = genai.GenerativeModel('gemini-pro')
+    
+    @classmethod
+    def offline(cls) -> "AIOptimizer":
+        """
+        Shared rule-based optimizer that never calls the Gemini API
+        
+        Unlike AIOptimizer(api_key=None), this ignores GEMINI_API_KEY. The
+        instance holds no per-call state, so one is created per process.
+        """
+        if cls._offline_instance is None:
+            with cls._offline_lock:
+                if cls._offline_instance is None:
+                    cls._offline_instance = cls(use_env=False)
+        return cls._offline_instance
     
     def reschedule_missed_dose(
         self, 
@@ -56,6 +156,71 @@ class AIOptimizer:
         else:
             return self._rule_based_reschedule(missed_dose, schedule)
     
+    async def reschedule_missed_dose_async(
+        self, 
+        missed_dose: MissedDose, 
+        schedule: Schedule
+    ) -> RescheduleProposal:
+        """
+        Async variant of reschedule_missed_dose that doesn't block on the AI call
+        
+        Args:
+            missed_dose: The missed dose event
+            schedule: The complete medication schedule
+            
+        Returns:
+            RescheduleProposal with new time and reasoning
+        """
+        if self.model and self.api_key:
+            return await self._ai_reschedule_async(missed_dose, schedule)
+        else:
+            return self._rule_based_reschedule(missed_dose, schedule)
+    
+    async def reschedule_many(
+        self, 
+        missed_doses: List[MissedDose], 
+        schedule: Schedule
+    ) -> List[RescheduleProposal]:
+        """
+        Generate proposals for several missed doses concurrently
+        
+        Args:
+            missed_doses: The missed dose events
+            schedule: The complete medication schedule
+            
+        Returns:
+            One RescheduleProposal per missed dose, in the same order
+        """
+        return list(await asyncio.gather(
+            *(self.reschedule_missed_dose_async(missed, schedule) for missed in missed_doses)
+        ))
+    
+    def reschedule_batch(
+        self, 
+        missed_doses: List[MissedDose], 
+        schedule: Schedule
+    ) -> List[RescheduleProposal]:
+        """
+        Rule-based proposals for many missed doses in one pass
+        
+        Gives the same results as the rule-based fallback of
+        reschedule_missed_dose, but classifies how late every dose is
+        at once (with NumPy, when installed). Never calls the AI.
+        
+        Args:
+            missed_doses: The missed dose events
+            schedule: The complete medication schedule
+            
+        Returns:
+            One RescheduleProposal per missed dose, in the same order
+        """
+        return [
+            _window_proposal(missed, window)
+            if schedule.get_medication(missed.medication_name)
+            else self._create_error_proposal(missed, "Medication not found")
+            for missed, window in zip(missed_doses, _rule_based_windows(missed_doses))
+        ]
+    
     def _ai_reschedule(
         self, 
         missed_dose: MissedDose, 
@@ -82,7 +247,29 @@ class AIOptimizer:
             return self._parse_ai_response(response.text, missed_dose)
             
         except Exception as e:
-            print(f"AI API error: {e}")
+            log.warning("AI API error: %s", e)
+            return self._rule_based_reschedule(missed_dose, schedule)
+    
+    async def _ai_reschedule_async(
+        self, 
+        missed_dose: MissedDose, 
+        schedule: Schedule
+    ) -> RescheduleProposal:
+        """Use Gemini AI to generate a rescheduling proposal without blocking"""
+        
+        med = schedule.get_medication(missed_dose.medication_name)
+        if not med:
+            return self._create_error_proposal(missed_dose, "Medication not found")
+        
+        constraints = schedule.get_constraints_for_drug(missed_dose.medication_name)
+        prompt = self._build_prompt(missed_dose, med, schedule, constraints)
+        
+        try:
+            response = await self.model.generate_content_async(prompt)
+            return self._parse_ai_response(response.text, missed_dose)
+            
+        except Exception as e:
+            log.warning("AI API error: %s", e)
             return self._rule_based_reschedule(missed_dose, schedule)
     
     def _build_prompt(self, missed_dose, med, schedule, constraints):
@@ -92,11 +279,7 @@ class AIOptimizer:
             f"- {c.description}" for c in constraints
         ]) if constraints else "No specific constraints"
         
-        other_meds = [m for m in schedule.medications if m.name != med.name]
-        other_meds_text = "\n".join([
-            f"- {m.name}: scheduled at {', '.join([t.strftime('%H:%M') for t in m.scheduled_times])}"
-            for m in other_meds
-        ]) if other_meds else "No other medications"
+        other_meds_text = schedule.formatted_times(exclude=med.name) or "No other medications"
         
         prompt = f"""You are a medication scheduling assistant. A patient has missed a dose and needs help rescheduling.
 
@@ -135,24 +318,21 @@ WARNINGS: [any warnings, or "None"]
     def _parse_ai_response(self, response_text: str, missed_dose: MissedDose) -> RescheduleProposal:
         """Parse the AI's response into a RescheduleProposal"""
         
-        lines = response_text.strip().split('\n')
         new_time_str = None
         reasoning = ""
         warnings = []
         
-        for line in lines:
-            if line.startswith('RECOMMENDED_TIME:'):
-                time_str = line.split(':', 1)[1].strip()
+        for match in _RESPONSE_RE.finditer(response_text):
+            if match.group('time'):
                 # Parse HH:MM
                 try:
-                    hour, minute = map(int, time_str.split(':'))
-                    new_time_str = time(hour, minute)
-                except:
+                    new_time_str = time.fromisoformat(match.group('time').zfill(5))
+                except ValueError:
                     pass
-            elif line.startswith('REASONING:'):
-                reasoning = line.split(':', 1)[1].strip()
-            elif line.startswith('WARNINGS:'):
-                warning_text = line.split(':', 1)[1].strip()
+            elif match.group('reason'):
+                reasoning = match.group('reason').strip()
+            elif match.group('warn'):
+                warning_text = match.group('warn').strip()
                 if warning_text.lower() != 'none':
                     warnings.append(warning_text)
         
@@ -179,40 +359,22 @@ WARNINGS: [any warnings, or "None"]
         if not med:
             return self._create_error_proposal(missed_dose, "Medication not found")
         
-        # Simple logic: take now if within reasonable window
-        time_diff = self._time_difference(missed_dose.scheduled_time, missed_dose.current_time)
-        
-        warnings = []
-        reasoning = ""
-        
-        if time_diff.total_seconds() < 7200:  # Within 2 hours
-            new_time = missed_dose.current_time
-            reasoning = "Take the dose now. You're within the acceptable window."
-        elif time_diff.total_seconds() < 14400:  # Within 4 hours
-            new_time = missed_dose.current_time
-            reasoning = "Take the dose now, but monitor for side effects."
-            warnings.append("Dose is significantly delayed - contact provider if concerned")
-        else:
-            # Skip this dose
-            new_time = None
-            reasoning = "Skip this dose and take the next scheduled dose."
-            warnings.append("More than 4 hours late - safer to skip and resume normal schedule")
-        
-        return RescheduleProposal(
-            missed_dose=missed_dose,
-            new_time=new_time or missed_dose.scheduled_time,
-            reasoning=reasoning,
-            warnings=warnings
+        return _window_proposal(
+            missed_dose, _rule_based_window(missed_dose.scheduled_time, missed_dose.current_time)
         )
     
     @staticmethod
     def _time_difference(time1: time, time2: time) -> timedelta:
-        """Calculate difference between two times"""
-        # Convert to datetime for easier math
-        today = datetime.today().date()
-        dt1 = datetime.combine(today, time1)
-        dt2 = datetime.combine(today, time2)
-        return dt2 - dt1
+        """
+        Calculate how long after time1 time2 is
+        
+        Wraps past midnight, so 23:00 -> 01:00 is 2 hours rather than -22.
+        """
+        seconds1 = _seconds_since_midnight(time1)
+        seconds2 = _seconds_since_midnight(time2)
+        if seconds2 < seconds1:
+            seconds2 += 86400
+        return timedelta(seconds=seconds2 - seconds1)
     
     @staticmethod
     def _create_error_proposal(missed_dose: MissedDose, error: str) -> RescheduleProposal:
@@ -222,4 +384,4 @@ WARNINGS: [any warnings, or "None"]
             new_time=missed_dose.current_time,
             reasoning=f"Error: {error}",
             warnings=["Unable to generate optimal schedule"]
-        )
\ No newline at end of file
+        )
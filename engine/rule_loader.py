@@ -1,12 +1,25 @@
 """
 Loads and parses constraint rules from YAML files
 """
-import yaml
+import copy
+import logging
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from datetime import timedelta
 from .models import Constraint
 
+log = logging.getLogger(__name__)
+
+
+# Durations like "2h", "30m", "1d" (a bare number means hours)
+_DURATION_RE = re.compile(r'^\s*(\d+)\s*([hmd]?)\s*$', re.IGNORECASE)
+_UNIT_SECONDS = {'h': 3600, 'm': 60, 'd': 86400, '': 3600}
+
+# Parsed YAML per file, as {path: (mtime, data)}
+_YAML_CACHE: Dict[Path, Tuple[float, object]] = {}
+
 
 class RuleLoader:
     """Loads scheduling rules and constraints from YAML files"""
@@ -24,27 +37,27 @@ class RuleLoader:
         constraints_file = self.rules_dir / "constraints.yaml"
         
         if not constraints_file.exists():
-            print(f"Warning: {constraints_file} not found")
+            log.warning("%s not found", constraints_file)
             return []
         
-        with open(constraints_file, 'r') as f:
-            data = yaml.safe_load(f)
+        data = self._load_yaml(constraints_file)
         
         if not data or 'constraints' not in data:
             return []
         
-        constraints = []
-        for item in data['constraints']:
-            constraint = Constraint(
-                type=item.get('type', 'unknown'),
-                drug_a=item.get('drug_a', ''),
-                drug_b=item.get('drug_b'),
-                min_gap=self._parse_timedelta(item.get('min_gap')),
-                description=item.get('description', '')
+        # Positional args follow Constraint's field order:
+        # type, drug_a, drug_b, min_gap, description
+        parse_timedelta = self._parse_timedelta
+        return [
+            Constraint(
+                item.get('type', 'unknown'),
+                item.get('drug_a', ''),
+                item.get('drug_b'),
+                parse_timedelta(item.get('min_gap')),
+                item.get('description', '')
             )
-            constraints.append(constraint)
-        
-        return constraints
+            for item in data['constraints']
+        ]
     
     def load_tags(self) -> Dict:
         """
@@ -56,13 +69,13 @@ class RuleLoader:
         tags_file = self.rules_dir / "tags.yaml"
         
         if not tags_file.exists():
-            print(f"Warning: {tags_file} not found")
+            log.warning("%s not found", tags_file)
             return {}
         
-        with open(tags_file, 'r') as f:
-            data = yaml.safe_load(f)
+        data = self._load_yaml(tags_file)
         
-        return data if data else {}
+        # Copied so callers can't change the cached parse
+        return copy.deepcopy(data) if data else {}
     
     def load_sources(self) -> Dict:
         """
@@ -74,16 +87,48 @@ class RuleLoader:
         sources_file = self.rules_dir / "sources.yaml"
         
         if not sources_file.exists():
-            print(f"Warning: {sources_file} not found")
+            log.warning("%s not found", sources_file)
             return {}
         
-        with open(sources_file, 'r') as f:
-            data = yaml.safe_load(f)
+        data = self._load_yaml(sources_file)
+        
+        # Copied so callers can't change the cached parse
+        return copy.deepcopy(data) if data else {}
+    
+    @staticmethod
+    def _load_yaml(path: Path):
+        """
+        Parse a YAML file, reusing the previous result if it hasn't changed
+        
+        The returned object is shared between calls, so treat it as read-only.
         
-        return data if data else {}
+        Args:
+            path: YAML file to load
+            
+        Returns:
+            Parsed YAML content
+        """
+        key = path.resolve()
+        mtime = key.stat().st_mtime
+        
+        cached = _YAML_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        # Imported here so using the engine without rule files never loads PyYAML
+        import yaml
+        
+        # libyaml's C loader is much faster than the pure-Python one when available
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        with open(key, 'r') as f:
+            data = yaml.load(f, Loader=loader)
+        
+        _YAML_CACHE[key] = (mtime, data)
+        return data
     
     @staticmethod
-    def _parse_timedelta(time_str: str) -> timedelta:
+    @lru_cache(maxsize=256)
+    def _parse_timedelta(time_str: str) -> Optional[timedelta]:
         """
         Parse a time string like '2h', '30m', '1d' into timedelta
         
@@ -91,22 +136,15 @@ class RuleLoader:
             time_str: Time string (e.g., "2h", "30m", "1d")
             
         Returns:
-            timedelta object
+            timedelta object, or None if the string is empty or malformed
         """
         if not time_str:
             return None
         
-        time_str = time_str.strip().lower()
-        
-        if time_str.endswith('h'):
-            hours = int(time_str[:-1])
-            return timedelta(hours=hours)
-        elif time_str.endswith('m'):
-            minutes = int(time_str[:-1])
-            return timedelta(minutes=minutes)
-        elif time_str.endswith('d'):
-            days = int(time_str[:-1])
-            return timedelta(days=days)
-        else:
-            # Assume hours if no unit
-            return timedelta(hours=int(time_str))
\ No newline at end of file
+        match = _DURATION_RE.match(str(time_str))
+        if not match:
+            log.warning("Could not parse duration %r", time_str)
+            return None
+        
+        amount, unit = match.groups()
+        return timedelta(seconds=int(amount) * _UNIT_SECONDS[unit.lower()])
\ No newline at end of file
@@ -4,6 +4,8 @@ Med Scheduler Demo
 Demonstrates AI-powered medication rescheduling when doses are missed
 """
 
+import asyncio
+import logging
 import os
 from datetime import time, timedelta
 from engine.models import Medication, Schedule, MissedDose, Constraint
@@ -125,7 +127,30 @@ def create_demo_schedule():
     return schedule
 
 
-def demo_scenario_1(optimizer, schedule):
+# Missed doses for the demo scenarios below
+SCENARIO_1_MISSED = MissedDose(
+    medication_name="Levothyroxine",
+    scheduled_time=time(6, 0),
+    current_time=time(8, 0),
+    reason="Overslept"
+)
+
+SCENARIO_2_MISSED = MissedDose(
+    medication_name="Metformin",
+    scheduled_time=time(20, 0),
+    current_time=time(23, 30),
+    reason="Forgot after dinner"
+)
+
+SCENARIO_3_MISSED = MissedDose(
+    medication_name="Lisinopril",
+    scheduled_time=time(8, 0),
+    current_time=time(9, 0),
+    reason="Morning rush"
+)
+
+
+def demo_scenario_1(optimizer, schedule, proposal=None):
     """Demo: Missed morning levothyroxine by 2 hours"""
     print_header("SCENARIO 1: Missed Morning Levothyroxine")
     
@@ -135,18 +160,12 @@ def demo_scenario_1(optimizer, schedule):
     print("  They're supposed to take Metformin with breakfast at 8:00 AM.")
     print("  What should they do?")
     
-    missed = MissedDose(
-        medication_name="Levothyroxine",
-        scheduled_time=time(6, 0),
-        current_time=time(8, 0),
-        reason="Overslept"
-    )
-    
-    proposal = optimizer.reschedule_missed_dose(missed, schedule)
+    if proposal is None:
+        proposal = optimizer.reschedule_missed_dose(SCENARIO_1_MISSED, schedule)
     print_proposal(proposal)
 
 
-def demo_scenario_2(optimizer, schedule):
+def demo_scenario_2(optimizer, schedule, proposal=None):
     """Demo: Missed evening metformin by several hours"""
     print_header("SCENARIO 2: Missed Evening Metformin")
     
@@ -155,18 +174,12 @@ def demo_scenario_2(optimizer, schedule):
     print("  It's now 11:30 PM and they just remembered.")
     print("  Should they take it now before bed, or skip it?")
     
-    missed = MissedDose(
-        medication_name="Metformin",
-        scheduled_time=time(20, 0),
-        current_time=time(23, 30),
-        reason="Forgot after dinner"
-    )
-    
-    proposal = optimizer.reschedule_missed_dose(missed, schedule)
+    if proposal is None:
+        proposal = optimizer.reschedule_missed_dose(SCENARIO_2_MISSED, schedule)
     print_proposal(proposal)
 
 
-def demo_scenario_3(optimizer, schedule):
+def demo_scenario_3(optimizer, schedule, proposal=None):
     """Demo: Missed lisinopril by just 1 hour"""
     print_header("SCENARIO 3: Missed Morning Lisinopril by 1 Hour")
     
@@ -175,20 +188,16 @@ def demo_scenario_3(optimizer, schedule):
     print("  It's now 9:00 AM - just one hour late.")
     print("  This is a simple case - should be safe to take now.")
     
-    missed = MissedDose(
-        medication_name="Lisinopril",
-        scheduled_time=time(8, 0),
-        current_time=time(9, 0),
-        reason="Morning rush"
-    )
-    
-    proposal = optimizer.reschedule_missed_dose(missed, schedule)
+    if proposal is None:
+        proposal = optimizer.reschedule_missed_dose(SCENARIO_3_MISSED, schedule)
     print_proposal(proposal)
 
 
 def main():
     """Run the demo"""
     
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(name)s: %(message)s")
+    
     print_header("Med Scheduler v0.1.0 - Demo")
     print("\nThis demo shows how AI helps reschedule medications when doses are missed.")
     
@@ -213,15 +222,21 @@ def main():
     # Initialize optimizer
     optimizer = AIOptimizer(api_key=api_key)
     
+    # Work out all three recommendations up front so the AI calls overlap
+    proposals = asyncio.run(optimizer.reschedule_many(
+        [SCENARIO_1_MISSED, SCENARIO_2_MISSED, SCENARIO_3_MISSED],
+        schedule
+    ))
+    
     # Run demo scenarios
     input("\n\nPress Enter to see Scenario 1...")
-    demo_scenario_1(optimizer, schedule)
+    demo_scenario_1(optimizer, schedule, proposals[0])
     
     input("\n\nPress Enter to see Scenario 2...")
-    demo_scenario_2(optimizer, schedule)
+    demo_scenario_2(optimizer, schedule, proposals[1])
     
     input("\n\nPress Enter to see Scenario 3...")
-    demo_scenario_3(optimizer, schedule)
+    demo_scenario_3(optimizer, schedule, proposals[2])
     
     print("\n\n" + "=" * 70)
     print("  Demo Complete!")
@@ -1,28 +1,3 @@
 """
-Med Scheduler Engine
-Core components for AI-powered medication scheduling
+Tests for the med scheduler
 """
-
-from .models import (
-    Medication,
-    Constraint,
-    Schedule,
-    MissedDose,
-    RescheduleProposal
-)
-from .optimizer import AIOptimizer
-from .rule_loader import RuleLoader
-from .api_client import OpenFDAClient
-
-__version__ = "0.1.0"
-
-__all__ = [
-    'Medication',
-    'Constraint',
-    'Schedule',
-    'MissedDose',
-    'RescheduleProposal',
-    'AIOptimizer',
-    'RuleLoader',
-    'OpenFDAClient',
-]
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Shared pytest fixtures for the med scheduler tests
+
+The models and the rule-based optimizer are only read by the tests, so
+they are built once per session. Tests that mutate a schedule use the
+function-scoped mutable_schedule instead.
+"""
+
+from datetime import time, timedelta
+
+import pytest
+
+from engine.models import Medication, Schedule
+
+
+def _fixture_names(item):
+    # Parametrize arguments show up in fixturenames but aren't fixtures
+    callspec = getattr(item, 'callspec', None)
+    params = callspec.params if callspec else {}
+    return tuple(sorted(name for name in item.fixturenames if name not in params))
+
+
+def pytest_collection_modifyitems(items):
+    # Within each module, run tests that use the same fixtures back to back.
+    # Modules keep their collected order so module-scoped fixtures are still
+    # set up once each, and the sort is stable so file order is kept within
+    # each group
+    module_order = {}
+    for item in items:
+        module_order.setdefault(getattr(item, 'module', None), len(module_order))
+    items.sort(key=lambda item: (module_order[getattr(item, 'module', None)], _fixture_names(item)))
+
+
+@pytest.fixture(scope="session")
+def med1():
+    return Medication(
+        name="Drug A",
+        dosage="50mg",
+        frequency="once daily",
+        scheduled_times=[time(8, 0)]
+    )
+
+
+@pytest.fixture(scope="session")
+def med2():
+    return Medication(
+        name="Drug B",
+        dosage="100mg",
+        frequency="twice daily",
+        scheduled_times=[time(8, 0), time(20, 0)]
+    )
+
+
+@pytest.fixture(scope="session")
+def base_schedule(med1, med2):
+    return Schedule(medications=[med1, med2], constraints=[])
+
+
+@pytest.fixture
+def mutable_schedule(med1, med2):
+    """A fresh schedule for tests that add medications or constraints"""
+    return Schedule(medications=[med1, med2], constraints=[])
+
+
+@pytest.fixture(scope="session")
+def single_drug_schedule():
+    med = Medication(
+        name="Test Drug",
+        dosage="100mg",
+        frequency="once daily",
+        scheduled_times=[time(8, 0)],
+        min_interval=timedelta(hours=24)
+    )
+    return Schedule(medications=[med], constraints=[])
+
+
+@pytest.fixture(scope="session")
+def optimizer():
+    # Imported here so model-only test runs never load the optimizer
+    from engine.optimizer import AIOptimizer
+
+    # Rule-based fallback only, even if GEMINI_API_KEY is set
+    return AIOptimizer.offline()
@@ -0,0 +1,345 @@
+"""
+Tests for the OpenFDA client
+"""
+
+import asyncio
+import json
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from engine.api_client import (
+    MOCK_DRUG_DATA,
+    OpenFDAClient,
+    _ExpiringLFUCache,
+    _PROFILE_CACHE,
+    _SEARCH_CACHE,
+    get_mock_drug_data,
+)
+
+
+class _FakeTimer:
+    """Monotonic clock the tests can move forward by hand"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# Labels served to bulk (limit > 1) queries. Dexmetformin comes first so a
+# plain substring match-back would wrongly pick it for "metformin".
+_BULK_LABELS = [
+    {'id': 'dexmetformin', 'openfda': {'brand_name': ["Dexmetformin"], 'generic_name': ["DEXMETFORMIN"]}},
+    {'id': 'metformin', 'openfda': {'brand_name': ["Glucophage"], 'generic_name': ["METFORMIN HYDROCHLORIDE"]}},
+    {'id': 'lisinopril', 'openfda': {'brand_name': ["Zestril"], 'generic_name': ["LISINOPRIL"]}},
+]
+
+
+class _LabelHandler(BaseHTTPRequestHandler):
+    """
+    Fake OpenFDA label.json endpoint, logging each query to server.requests
+
+    Single-drug queries get one record echoing the request path, or a 404
+    for "missing" drugs. Bulk queries get every _BULK_LABELS record with a
+    name containing one of the searched names, or a 404 if there are none.
+    """
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        names = set(re.findall(r'"([^"]+)"', params['search'][0]))
+        limit = int(params['limit'][0])
+        self.server.requests.append((names, limit))
+
+        if limit > 1:
+            records = [
+                record for record in _BULK_LABELS
+                if any(
+                    name in label_name.lower()
+                    for name in names
+                    for label_name in record['openfda']['brand_name'] + record['openfda']['generic_name']
+                )
+            ]
+        elif "missing" in self.path:
+            records = []
+        else:
+            records = [{
+                'path': self.path,
+                'drug_interactions': ["Avoid with warfarin"],
+                'dosage_and_administration': ["Take with food."],
+            }]
+
+        if not records:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'results': records}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def timer():
+    return _FakeTimer()
+
+
+@pytest.fixture
+def label_http():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _LabelHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def label_server(label_http):
+    return f"http://127.0.0.1:{label_http.server_port}"
+
+
+@pytest.fixture
+def label_requests(label_http):
+    """(searched names, limit) for each query the label server received"""
+    return label_http.requests
+
+
+@pytest.fixture
+def client(label_server):
+    """A client pointed at the local label server, with empty caches"""
+    _SEARCH_CACHE.clear()
+    _PROFILE_CACHE.clear()
+    client = OpenFDAClient(cache_name=None)
+    client.BASE_URL = label_server
+    yield client
+    client.close()
+    _SEARCH_CACHE.clear()
+    _PROFILE_CACHE.clear()
+
+
+# Expiring LFU cache
+
+def test_cache_evicts_expired_entries(timer):
+    """Test that storing into a full cache works when the victim has expired"""
+    cache = _ExpiringLFUCache(maxsize=2, ttl=10, timer=timer)
+    cache['a'] = 1
+    cache['b'] = 2
+    timer.now = 11
+
+    cache['c'] = 3
+
+    assert len(cache) == 2
+    assert cache['c'] == 3
+
+
+def test_cache_expires_entries(timer):
+    """Test that entries older than ttl are dropped on lookup"""
+    cache = _ExpiringLFUCache(maxsize=2, ttl=10, timer=timer)
+    cache['a'] = 1
+    timer.now = 11
+
+    assert cache.get('a') is None
+    assert 'a' not in cache
+
+
+def test_cache_counts_hits_and_misses(timer):
+    """Test that lookups are counted and evictions are not"""
+    cache = _ExpiringLFUCache(maxsize=2, ttl=10, timer=timer)
+    cache['a'] = 1
+    cache['b'] = 2
+
+    assert cache['a'] == 1
+    assert cache.get('missing') is None
+    cache['c'] = 3  # evicts 'b', the least frequently used
+    timer.now = 11
+    assert cache.get('a') is None  # expired
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_pop_returns_value(timer):
+    """Test that pop unwraps the stored value and honours a default"""
+    cache = _ExpiringLFUCache(maxsize=2, ttl=10, timer=timer)
+    cache['a'] = 1
+
+    assert cache.pop('a') == 1
+    assert cache.pop('a', None) is None
+    with pytest.raises(KeyError):
+        cache.pop('a')
+
+
+# Label search
+
+def test_search_results_are_copies(client):
+    """Test that editing a search result doesn't change later lookups"""
+    client.search_drug("drug one")['MUTATED'] = True
+    bulk = client.search_drugs_bulk(["drug one", "Drug One"])
+    bulk["drug one"]['drug_interactions'].append("MUTATED")
+
+    assert 'MUTATED' not in client.search_drug("drug one")
+    assert bulk["Drug One"]['drug_interactions'] == ["Avoid with warfarin"]
+    assert client.search_drug("drug one")['drug_interactions'] == ["Avoid with warfarin"]
+
+
+def test_async_search_results_are_copies(client):
+    """Test that async results, including repeated names, don't share the cached record"""
+    pytest.importorskip("aiohttp")
+
+    async def search(names):
+        async with client:
+            return await client.bulk_search(names)
+
+    first, repeat = asyncio.run(search(["drug one", "drug one"]))
+    first['MUTATED'] = True
+
+    assert 'MUTATED' not in repeat
+    assert 'MUTATED' not in client.search_drug("drug one")
+
+
+def test_not_found_expires_sooner(label_server, tmp_path):
+    """Test that the sync disk cache keeps 404s for NOT_FOUND_EXPIRE_AFTER and hits for CACHE_EXPIRE_AFTER"""
+    pytest.importorskip("requests_cache")
+    _SEARCH_CACHE.clear()
+    client = OpenFDAClient(cache_name=str(tmp_path / "cache"))
+    client.BASE_URL = label_server
+
+    with client:
+        assert client.search_drug("missing drug") is None
+        assert client.search_drug("found drug") is not None
+        expires = {
+            response.status_code: response.expires
+            for response in client.session.cache.responses.values()
+        }
+    _SEARCH_CACHE.clear()
+
+    now = datetime.now(timezone.utc)
+    assert set(expires) == {200, 404}
+    assert expires[404] <= now + timedelta(seconds=OpenFDAClient.NOT_FOUND_EXPIRE_AFTER)
+    assert expires[200] > now + timedelta(seconds=OpenFDAClient.CACHE_EXPIRE_AFTER - 60)
+
+
+def test_bulk_matches_back_by_whole_name(client, label_requests):
+    """Test that bulk results are matched to names by whole words, in one query"""
+    results = client.search_drugs_bulk(["metformin", "Zestril", " Metformin "])
+
+    assert list(results) == ["metformin", "Zestril", " Metformin "]
+    assert results["metformin"]['id'] == 'metformin'  # not dexmetformin
+    assert results[" Metformin "]['id'] == 'metformin'
+    assert results["Zestril"]['id'] == 'lisinopril'
+    # Deduplicated into a single OR-query, with no per-drug fallbacks
+    assert label_requests == [({"metformin", "zestril"}, 10)]
+
+
+def test_bulk_chunks_and_falls_back(client, label_requests):
+    """Test chunking into OR-queries and the per-drug fallback after a bulk 404"""
+    client.BULK_CHUNK_SIZE = 2
+    names = ["drug a", "drug b", "drug c", "missing d", "drug a"]
+
+    results = client.search_drugs_bulk(names)
+
+    bulk_queries = [query for query in label_requests if query[1] > 1]
+    single_queries = [names for names, limit in label_requests if limit == 1]
+    assert bulk_queries == [({"drug a", "drug b"}, 10), ({"drug c", "missing d"}, 10)]
+    assert single_queries == [{"drug a"}, {"drug b"}, {"drug c"}, {"missing d"}]
+    assert list(results) == ["drug a", "drug b", "drug c", "missing d"]
+    assert results["missing d"] is None
+    assert all(results[name] is not None for name in ("drug a", "drug b", "drug c"))
+
+
+# Drug profiles
+
+def test_profile_getters_return_copies(client):
+    """Test that editing a returned profile doesn't change later lookups"""
+    client.get_food_interactions("drug one")['notes'].append("MUTATED")
+    client.get_drug_interactions("drug one").append("MUTATED")
+    client.get_drug_profile("drug one")['food_info']['with_food'] = False
+
+    profile = client.get_drug_profile("drug one")
+
+    assert profile['interactions'] == ["Avoid with warfarin"]
+    assert profile['food_info'] == {
+        'with_food': True,
+        'empty_stomach': False,
+        'notes': ["Should be taken with food"],
+    }
+
+
+# Async client
+
+def test_bulk_search_across_event_loops(client):
+    """Test that the client can be reused under separate asyncio.run() calls"""
+    pytest.importorskip("aiohttp")
+
+    async def search_and_close(names):
+        async with client:
+            return await client.bulk_search(names)
+
+    first = asyncio.run(client.bulk_search(["drug one"]))
+    second = asyncio.run(search_and_close(["drug two"]))
+
+    assert first[0] is not None
+    assert second[0] is not None
+    assert first[0] != second[0]
+
+
+def test_async_search_with_disk_cache(label_server, tmp_path):
+    """Test that async lookups work with on-disk caching enabled, whether or not aiosqlite is installed"""
+    pytest.importorskip("aiohttp")
+    client = OpenFDAClient(cache_name=str(tmp_path / "cache"))
+    client.BASE_URL = label_server
+
+    async def lookup():
+        async with client:
+            return await client.search_drug_async("disk cached drug")
+
+    assert asyncio.run(lookup()) is not None
+
+
+def test_async_not_found_expires_sooner(label_server, tmp_path):
+    """Test that the async disk cache keeps 404s for NOT_FOUND_EXPIRE_AFTER, not the full day"""
+    pytest.importorskip("aiohttp_client_cache")
+    pytest.importorskip("aiosqlite")
+    client = OpenFDAClient(cache_name=str(tmp_path / "cache"))
+    client.BASE_URL = label_server
+
+    async def lookup_and_read_expiry():
+        async with client:
+            assert await client.search_drug_async("missing drug") is None
+            responses = (await client._get_async_session()).cache.responses
+            return [(await responses.read(key)).expires async for key in responses.keys()]
+
+    expires = asyncio.run(lookup_and_read_expiry())
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert len(expires) == 1
+    assert expires[0] <= now + timedelta(seconds=OpenFDAClient.NOT_FOUND_EXPIRE_AFTER)
+
+
+# Mock data
+
+@pytest.mark.parametrize("name,expected", [
+    ("lisinopril", 'lisinopril'),
+    ("Prinivil", 'lisinopril'),
+    (" Zestril ", 'lisinopril'),
+    ("GLUCOPHAGE", 'metformin'),
+    ("Synthroid", 'levothyroxine'),
+    ("aspirin", None),
+])
+def test_get_mock_drug_data(name, expected):
+    """Test mock lookups by generic or brand name, ignoring case and surrounding spaces"""
+    found = get_mock_drug_data(name)
+
+    assert found is (MOCK_DRUG_DATA[expected] if expected else None)
@@ -2,144 +2,356 @@
 Basic tests for the med scheduler
 """
 
-import unittest
-from datetime import time, timedelta
+import asyncio
+import sys
+from dataclasses import FrozenInstanceError
+from datetime import date, datetime, time, timedelta
+from time import perf_counter_ns
+
+import pytest
+
 from engine.models import Medication, Schedule, MissedDose, Constraint
-from engine.optimizer import AIOptimizer
-
-
-class TestMedicationModel(unittest.TestCase):
-    """Test the Medication data model"""
-    
-    def test_create_medication(self):
-        """Test creating a basic medication"""
-        med = Medication(
-            name="Test Drug",
-            dosage="100mg",
-            frequency="once daily",
-            scheduled_times=[time(8, 0)]
-        )
-        
-        self.assertEqual(med.name, "Test Drug")
-        self.assertEqual(med.dosage, "100mg")
-        self.assertEqual(len(med.scheduled_times), 1)
-    
-    def test_medication_with_constraints(self):
-        """Test medication with food constraints"""
-        med = Medication(
-            name="Test Drug",
-            dosage="100mg",
-            frequency="once daily",
-            scheduled_times=[time(8, 0)],
-            with_food=True,
-            empty_stomach=False
-        )
-        
-        self.assertTrue(med.with_food)
-        self.assertFalse(med.empty_stomach)
-
-
-class TestSchedule(unittest.TestCase):
-    """Test the Schedule functionality"""
-    
-    def setUp(self):
-        """Set up test medications and schedule"""
-        self.med1 = Medication(
-            name="Drug A",
-            dosage="50mg",
-            frequency="once daily",
-            scheduled_times=[time(8, 0)]
-        )
-        
-        self.med2 = Medication(
-            name="Drug B",
-            dosage="100mg",
-            frequency="twice daily",
-            scheduled_times=[time(8, 0), time(20, 0)]
-        )
-        
-        self.schedule = Schedule(
-            medications=[self.med1, self.med2],
-            constraints=[]
-        )
-    
-    def test_get_medication(self):
-        """Test finding a medication by name"""
-        found = self.schedule.get_medication("Drug A")
-        self.assertIsNotNone(found)
-        self.assertEqual(found.name, "Drug A")
-    
-    def test_get_medication_not_found(self):
-        """Test that non-existent medication returns None"""
-        found = self.schedule.get_medication("Drug C")
-        self.assertIsNone(found)
-
-
-class TestMissedDose(unittest.TestCase):
-    """Test missed dose handling"""
-    
-    def test_create_missed_dose(self):
-        """Test creating a missed dose event"""
-        missed = MissedDose(
-            medication_name="Test Drug",
-            scheduled_time=time(8, 0),
-            current_time=time(10, 0),
-            reason="Overslept"
-        )
-        
-        self.assertEqual(missed.medication_name, "Test Drug")
-        self.assertEqual(missed.scheduled_time, time(8, 0))
-        self.assertEqual(missed.current_time, time(10, 0))
-
-
-class TestOptimizer(unittest.TestCase):
-    """Test the AI optimizer (rule-based fallback)"""
-    
-    def setUp(self):
-        """Set up test schedule and optimizer"""
-        self.med = Medication(
-            name="Test Drug",
-            dosage="100mg",
-            frequency="once daily",
-            scheduled_times=[time(8, 0)],
-            min_interval=timedelta(hours=24)
-        )
-        
-        self.schedule = Schedule(
-            medications=[self.med],
-            constraints=[]
-        )
-        
-        # Create optimizer without API key (uses rule-based)
-        self.optimizer = AIOptimizer(api_key=None)
-    
-    def test_reschedule_within_window(self):
-        """Test rescheduling when within acceptable window"""
-        missed = MissedDose(
+
+
+# Reused time literals, built once at import
+_T8 = time(8, 0)
+_T20 = time(20, 0)
+
+
+# Medication model
+
+@pytest.mark.parametrize("extra,with_food,empty_stomach", [
+    pytest.param({}, None, None, id="basic"),
+    pytest.param({'with_food': True, 'empty_stomach': False}, True, False, id="food_constraints"),
+])
+def test_create_medication(extra, with_food, empty_stomach):
+    """Test creating a medication, with and without food constraints"""
+    med = Medication(
+        name="Test Drug",
+        dosage="100mg",
+        frequency="once daily",
+        scheduled_times=[_T8],
+        **extra
+    )
+
+    assert med.name == "Test Drug"
+    assert med.dosage == "100mg"
+    assert med.scheduled_times == [_T8]
+    assert med.with_food == with_food
+    assert med.empty_stomach == empty_stomach
+
+
+def test_medication_is_immutable(med1):
+    """Test that medications can't be changed once built"""
+    with pytest.raises(FrozenInstanceError):
+        med1.dosage = "75mg"
+
+
+# Schedule
+
+def test_get_medication(base_schedule):
+    """Test finding a medication by name"""
+    found = base_schedule.get_medication("Drug A")
+    assert found is not None
+    assert found.name == "Drug A"
+
+
+def test_get_medication_not_found(base_schedule):
+    """Test that non-existent medication returns None"""
+    found = base_schedule.get_medication("Drug C")
+    assert found is None
+
+
+def test_get_medication_first_match_wins(med1):
+    """Test that the name index keeps the first medication with a given name"""
+    duplicate = Medication(
+        name="drug a",
+        dosage="25mg",
+        frequency="once daily",
+        scheduled_times=[time(9, 0)]
+    )
+    schedule = Schedule(medications=[med1, duplicate], constraints=[])
+
+    assert schedule.get_medication("DRUG A") is med1
+
+
+@pytest.mark.parametrize("n", [10, 100, 1000])
+def test_get_medication_scales(n):
+    """Test that name lookups stay fast as the schedule grows"""
+    schedule = Schedule(
+        medications=[
+            Medication(name=f"Drug {i}", dosage="10mg", frequency="once daily", scheduled_times=[_T8])
+            for i in range(n)
+        ],
+        constraints=[]
+    )
+    names = [f"drug {i % n}" for i in range(1000)]
+
+    start = perf_counter_ns()
+    found = [schedule.get_medication(name) for name in names]
+    elapsed = perf_counter_ns() - start
+
+    assert all(found)
+    # The index takes well under 1ms; a linear scan at n=1000 takes ~20ms
+    assert elapsed < 10_000_000
+
+
+def test_add_medication_updates_lookup(mutable_schedule):
+    """Test that medications added later can be found"""
+    med3 = Medication(
+        name="Drug C",
+        dosage="10mg",
+        frequency="once daily",
+        scheduled_times=[time(12, 0)]
+    )
+    mutable_schedule.add_medication(med3)
+
+    assert mutable_schedule.get_medication("drug c") is med3
+
+
+def test_formatted_times(mutable_schedule):
+    """Test the per-medication time listing used in AI prompts"""
+    assert mutable_schedule.formatted_times(exclude="Drug A") == "- Drug B: scheduled at 08:00, 20:00"
+
+    mutable_schedule.add_medication(Medication(
+        name="Drug C",
+        dosage="10mg",
+        frequency="once daily",
+        scheduled_times=[time(12, 0)]
+    ))
+    assert mutable_schedule.formatted_times(exclude="Drug A") == (
+        "- Drug B: scheduled at 08:00, 20:00\n- Drug C: scheduled at 12:00"
+    )
+
+
+def test_get_constraints_for_drug(mutable_schedule):
+    """Test finding constraints on either side of an interaction"""
+    interaction = Constraint(
+        type="drug_interaction",
+        drug_a="Drug A",
+        drug_b="Drug B",
+        min_gap=timedelta(hours=4)
+    )
+    mutable_schedule.add_constraint(interaction)
+
+    assert mutable_schedule.get_constraints_for_drug("drug a") == [interaction]
+    assert mutable_schedule.get_constraints_for_drug("DRUG B") == [interaction]
+    assert mutable_schedule.get_constraints_for_drug("Drug C") == []
+
+
+# Missed doses
+
+def test_create_missed_dose():
+    """Test creating a missed dose event"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(10, 0),
+        reason="Overslept"
+    )
+
+    assert missed.medication_name == "Test Drug"
+    assert missed.scheduled_time == _T8
+    assert missed.current_time == time(10, 0)
+
+
+def test_missed_dose_is_immutable():
+    """Test that missed dose events are frozen and hashable"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(10, 0)
+    )
+
+    with pytest.raises(FrozenInstanceError):
+        missed.current_time = time(11, 0)
+    assert len({missed, missed}) == 1
+
+
+# Optimizer (rule-based fallback)
+
+@pytest.mark.parametrize("hours_late,expect_warnings,expect_take_now", [
+    pytest.param(h, warn, take_now, id=f"{h}h")
+    for h, warn, take_now in [(1, False, True), (2, True, True), (4, True, False), (10, True, False)]
+])
+def test_reschedule(optimizer, single_drug_schedule, hours_late, expect_warnings, expect_take_now):
+    """Test each rescheduling window either side of the 2h and 4h boundaries"""
+    current_time = (datetime.combine(date.today(), _T8) + timedelta(hours=hours_late)).time()
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=current_time
+    )
+
+    proposal = optimizer.reschedule_missed_dose(missed, single_drug_schedule)
+
+    assert proposal is not None
+    assert proposal.missed_dose == missed
+    assert proposal.reasoning
+    assert bool(proposal.warnings) is expect_warnings
+    assert proposal.new_time == (current_time if expect_take_now else _T8)
+
+
+def test_reschedule_late_past_midnight(optimizer, single_drug_schedule):
+    """Test that lateness is measured across midnight"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T20,
+        current_time=time(1, 0)  # 5 hours late
+    )
+
+    assert optimizer._time_difference(missed.scheduled_time, missed.current_time) == timedelta(hours=5)
+
+    proposal = optimizer.reschedule_missed_dose(missed, single_drug_schedule)
+    assert proposal.warnings
+
+
+def test_reschedule_proposals_do_not_share_warnings(optimizer, single_drug_schedule):
+    """Test that memoized decisions still give each proposal its own warnings list"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(18, 0)
+    )
+
+    first = optimizer.reschedule_missed_dose(missed, single_drug_schedule)
+    first.warnings.append("Edited by caller")
+    second = optimizer.reschedule_missed_dose(missed, single_drug_schedule)
+
+    assert "Edited by caller" not in second.warnings
+
+
+def test_reschedule_many(optimizer, single_drug_schedule):
+    """Test that batched async rescheduling matches the one-at-a-time path"""
+    missed_doses = [
+        MissedDose(
             medication_name="Test Drug",
-            scheduled_time=time(8, 0),
-            current_time=time(9, 0)  # 1 hour late
+            scheduled_time=_T8,
+            current_time=current
         )
-        
-        proposal = self.optimizer.reschedule_missed_dose(missed, self.schedule)
-        
-        self.assertIsNotNone(proposal)
-        self.assertEqual(proposal.missed_dose, missed)
-        self.assertIsNotNone(proposal.reasoning)
-    
-    def test_reschedule_very_late(self):
-        """Test rescheduling when very late"""
-        missed = MissedDose(
+        for current in (time(9, 0), time(18, 0))
+    ]
+
+    proposals = asyncio.run(optimizer.reschedule_many(missed_doses, single_drug_schedule))
+
+    assert proposals == [
+        optimizer.reschedule_missed_dose(m, single_drug_schedule) for m in missed_doses
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False], ids=["numpy", "pure_python"])
+@pytest.mark.parametrize("n", [1, 10, 100])
+def test_reschedule_batch(optimizer, single_drug_schedule, monkeypatch, n, use_numpy):
+    """Test that the batch path matches reschedule_missed_dose, with or without NumPy"""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setitem(sys.modules, "numpy", None)
+
+    # Spread the lateness across the whole day, plus one unknown medication
+    missed_doses = [
+        MissedDose(
             medication_name="Test Drug",
-            scheduled_time=time(8, 0),
-            current_time=time(18, 0)  # 10 hours late
+            scheduled_time=_T8,
+            current_time=(datetime.combine(date.today(), _T8) + timedelta(minutes=i * 1440 // n)).time()
         )
-        
-        proposal = self.optimizer.reschedule_missed_dose(missed, self.schedule)
-        
-        self.assertIsNotNone(proposal)
-        self.assertTrue(len(proposal.warnings) > 0)
+        for i in range(n)
+    ]
+    missed_doses[-1] = MissedDose(medication_name="Unknown", scheduled_time=_T8, current_time=_T20)
+
+    proposals = optimizer.reschedule_batch(missed_doses, single_drug_schedule)
+
+    assert proposals == [
+        optimizer.reschedule_missed_dose(m, single_drug_schedule) for m in missed_doses
+    ]
+
+
+def test_parse_ai_response(optimizer):
+    """Test parsing the structured fields out of an AI response"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(9, 0)
+    )
+    response = (
+        "RECOMMENDED_TIME: 9:30\n"
+        "REASONING: Take it with a snack.\n"
+        "WARNINGS: Avoid alcohol tonight\n"
+    )
+
+    proposal = optimizer._parse_ai_response(response, missed)
+
+    assert proposal.new_time == time(9, 30)
+    assert proposal.reasoning == "Take it with a snack."
+    assert proposal.warnings == ["Avoid alcohol tonight"]
+
+
+def test_parse_ai_response_bad_time(optimizer):
+    """Test that an unparseable time falls back to taking the dose now"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(9, 0)
+    )
+
+    proposal = optimizer._parse_ai_response("RECOMMENDED_TIME: 25:99\nWARNINGS: None", missed)
+
+    assert proposal.new_time == time(9, 0)
+    assert proposal.warnings == []
+
+
+def test_parse_ai_response_empty_field(optimizer):
+    """Test that an empty field doesn't swallow the line after it"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(9, 0)
+    )
+
+    proposal = optimizer._parse_ai_response(
+        "RECOMMENDED_TIME: 9:30\nREASONING:\nWARNINGS: Avoid alcohol", missed
+    )
+
+    assert proposal.warnings == ["Avoid alcohol"]
+
+
+def test_parse_ai_response_crlf(optimizer):
+    """Test that Windows line endings don't hide the recommended time"""
+    missed = MissedDose(
+        medication_name="Test Drug",
+        scheduled_time=_T8,
+        current_time=time(9, 0)
+    )
+
+    proposal = optimizer._parse_ai_response(
+        "RECOMMENDED_TIME: 9:30\r\nREASONING: ok\r\nWARNINGS: Avoid alcohol\r\n", missed
+    )
+
+    assert proposal.new_time == time(9, 30)
+    assert proposal.reasoning == "ok"
+    assert proposal.warnings == ["Avoid alcohol"]
+
+
+def test_offline_optimizer_is_shared(monkeypatch):
+    """Test that the offline optimizer is one instance and ignores GEMINI_API_KEY"""
+    from engine.optimizer import AIOptimizer
+
+    monkeypatch.setenv("GEMINI_API_KEY", "not-a-real-key")
+
+    optimizer = AIOptimizer.offline()
+
+    assert optimizer is AIOptimizer.offline()
+    assert optimizer.model is None
+    assert optimizer.api_key is None
+
+
+def test_optimizer_can_ignore_env_key(monkeypatch):
+    """Test that use_env=False keeps GEMINI_API_KEY from enabling the AI path"""
+    from engine.optimizer import AIOptimizer
+
+    monkeypatch.setenv("GEMINI_API_KEY", "not-a-real-key")
 
+    optimizer = AIOptimizer(use_env=False)
 
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    assert optimizer.api_key is None
+    assert optimizer.model is None
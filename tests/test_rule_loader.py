@@ -0,0 +1,95 @@
+"""
+Tests for loading rules from YAML
+"""
+
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+import yaml
+
+from engine.rule_loader import RuleLoader
+
+RULES_DIR = Path(__file__).resolve().parent.parent / "rules"
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    (tmp_path / "constraints.yaml").write_text(
+        "constraints:\n"
+        "  - type: drug_interaction\n"
+        "    drug_a: levothyroxine\n"
+        "    drug_b: calcium\n"
+        "    min_gap: 4h\n"
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def yaml_loads(monkeypatch):
+    """Count how many times the loader actually parses a file"""
+    calls = []
+    real_load = yaml.load
+
+    def counting_load(stream, Loader):
+        calls.append(stream.name)
+        return real_load(stream, Loader=Loader)
+
+    monkeypatch.setattr(yaml, "load", counting_load)
+    return calls
+
+
+# YAML cache
+
+def test_constraints_reparsed_only_when_file_changes(rules_dir, yaml_loads):
+    """Test that an unchanged file is parsed once and a touched one is parsed again"""
+    loader = RuleLoader(str(rules_dir))
+
+    first = loader.load_constraints()
+    second = loader.load_constraints()
+    assert len(yaml_loads) == 1
+
+    constraints_file = rules_dir / "constraints.yaml"
+    mtime = constraints_file.stat().st_mtime
+    os.utime(constraints_file, (mtime + 10, mtime + 10))
+    third = loader.load_constraints()
+
+    assert len(yaml_loads) == 2
+    assert first == second == third
+
+
+@pytest.mark.parametrize("method", ["load_tags", "load_sources"])
+def test_loaded_rules_are_copies(method):
+    """Test that editing loaded tags or sources doesn't change later loads"""
+    loader = RuleLoader(str(RULES_DIR))
+
+    first = getattr(loader, method)()
+    first["MUTATED"] = True
+
+    assert "MUTATED" not in getattr(loader, method)()
+
+
+# Durations
+
+@pytest.mark.parametrize("value,expected", [
+    ("2h", timedelta(hours=2)),
+    ("30m", timedelta(minutes=30)),
+    ("1d", timedelta(days=1)),
+    ("2 H", timedelta(hours=2)),
+    (24, timedelta(hours=24)),  # bare YAML integers are hours
+    ("abc", None),
+    (None, None),
+])
+def test_parse_timedelta(value, expected):
+    """Test parsing min_gap durations, with malformed ones giving None"""
+    assert RuleLoader._parse_timedelta(value) == expected
+
+
+def test_parse_timedelta_warns_on_malformed(caplog):
+    """Test that a malformed duration is logged rather than raised"""
+    with caplog.at_level(logging.WARNING, logger="engine.rule_loader"):
+        assert RuleLoader._parse_timedelta("four hours") is None
+
+    assert "four hours" in caplog.text